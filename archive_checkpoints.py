@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Delta-compressed archive of converted veRL checkpoints.
+
+Stores the huggingface/ dir of every global_step_* as one base step plus
+per-step tensor deltas. Each tensor is XORed byte-for-byte against the same
+tensor in the base step (exact for bf16 or any other dtype), split into byte
+planes so the mostly-zero high bytes compress well, and compressed with zstd
+(zlib if zstandard is not installed). Non-weight files (config.json,
+tokenizer files, ...) are stored once per unique content.
+
+Run convert_checkpoint.py first so each step has model.safetensors.
+
+Archive layout:
+    <archive>/manifest.json
+    <archive>/blobs/<sha256>                      # deduplicated non-weight files
+    <archive>/deltas/global_step_N/<file>.delta   # concatenated compressed frames
+
+Usage:
+    python archive_checkpoints.py archive /path/to/outputs/run_name
+    python archive_checkpoints.py archive /path/to/outputs/run_name --archive /path/to/archive
+    python archive_checkpoints.py list /path/to/outputs/run_name/archive
+    python archive_checkpoints.py restore /path/to/outputs/run_name/archive --step 500 --out /tmp/step_500
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import struct
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from convert_checkpoint import resolve_checkpoint_dirs
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+ZSTD_LEVEL = 10
+ZLIB_LEVEL = 6
+
+# Element sizes for safetensors dtypes; used to split tensors into byte planes
+_DTYPE_SIZES = {
+    "BOOL": 1, "U8": 1, "I8": 1, "F8_E4M3": 1, "F8_E5M2": 1,
+    "I16": 2, "U16": 2, "F16": 2, "BF16": 2,
+    "I32": 4, "U32": 4, "F32": 4,
+    "I64": 8, "U64": 8, "F64": 8,
+}
+
+
+# ============================================================
+# Compression
+# ============================================================
+
+def default_codec() -> str:
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Archive uses zstd but the zstandard package is not installed")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return zlib.compress(data, ZLIB_LEVEL)
+
+
+def decompress(data: bytes, codec: str, raw_len: int) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Archive uses zstd but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data, max_output_size=raw_len)
+    return zlib.decompress(data)
+
+
+def shuffle_bytes(buf: np.ndarray, itemsize: int) -> bytes:
+    """Group byte k of every element together (sign/exponent bytes end up adjacent)."""
+    if itemsize <= 1:
+        return buf.tobytes()
+    return buf.reshape(-1, itemsize).T.tobytes()
+
+
+def unshuffle_bytes(data: bytes, itemsize: int) -> np.ndarray:
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if itemsize <= 1:
+        return buf
+    return buf.reshape(itemsize, -1).T.reshape(-1)
+
+
+# ============================================================
+# Safetensors helpers
+# ============================================================
+
+def read_safetensors_layout(path: Path) -> tuple[bytes, int, list[dict]]:
+    """Parse a safetensors file without loading it.
+
+    Returns:
+        (raw header bytes incl. 8-byte length prefix, data region start,
+         segments covering the whole data region in file order)
+
+    Each segment is {"name", "dtype", "start", "end"} with offsets relative to
+    the data region. Bytes not owned by any tensor become unnamed segments so
+    the file round-trips byte-for-byte.
+    """
+    with open(path, "rb") as f:
+        prefix = f.read(8)
+        (header_len,) = struct.unpack("<Q", prefix)
+        header_bytes = f.read(header_len)
+    data_start = 8 + header_len
+    data_len = path.stat().st_size - data_start
+
+    header = json.loads(header_bytes)
+    tensors = sorted(
+        (
+            {"name": name, "dtype": info["dtype"], "start": info["data_offsets"][0], "end": info["data_offsets"][1]}
+            for name, info in header.items()
+            if name != "__metadata__"
+        ),
+        key=lambda t: t["start"],
+    )
+
+    segments = []
+    pos = 0
+    for t in tensors:
+        if t["start"] > pos:
+            segments.append({"name": None, "dtype": "U8", "start": pos, "end": t["start"]})
+        segments.append(t)
+        pos = t["end"]
+    if pos < data_len:
+        segments.append({"name": None, "dtype": "U8", "start": pos, "end": data_len})
+
+    return prefix + header_bytes, data_start, segments
+
+
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# ============================================================
+# Archive
+# ============================================================
+
+class CheckpointArchive:
+    """One base step plus XOR deltas for every other step."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.manifest_path = root / MANIFEST_NAME
+        if self.manifest_path.exists():
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+            if self.manifest.get("version") != MANIFEST_VERSION:
+                raise ValueError(f"Unsupported archive version: {self.manifest.get('version')}")
+        else:
+            self.manifest = {
+                "version": MANIFEST_VERSION,
+                "codec": default_codec(),
+                "base_step": None,
+                "steps": {},
+            }
+        self.codec = self.manifest["codec"]
+        self._base_index = None
+
+    # ---------- manifest ----------
+
+    def save_manifest(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        tmp_path.replace(self.manifest_path)
+
+    def steps(self) -> list[int]:
+        return sorted(int(s) for s in self.manifest["steps"])
+
+    # ---------- blobs ----------
+
+    def _put_blob(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = self.root / "blobs" / digest
+        if not blob_path.exists():
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = blob_path.with_suffix(".tmp")
+            tmp_path.write_bytes(compress(data, self.codec))
+            tmp_path.replace(blob_path)
+        return digest
+
+    def _get_blob(self, digest: str, raw_len: int) -> bytes:
+        data = decompress((self.root / "blobs" / digest).read_bytes(), self.codec, raw_len)
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Corrupt blob: {digest}")
+        return data
+
+    # ---------- base tensors ----------
+
+    def _base_tensor_index(self) -> dict[str, tuple[str, dict]]:
+        """Map tensor name -> (file name, segment entry) for the base step."""
+        if self._base_index is None:
+            self._base_index = {}
+            base = self.manifest["steps"].get(str(self.manifest["base_step"]), {})
+            for fname, entry in base.get("files", {}).items():
+                for seg in entry.get("segments", []):
+                    if seg["name"] is not None:
+                        self._base_index[seg["name"]] = (fname, seg)
+        return self._base_index
+
+    def _read_base_tensor(self, name: str, dtype: str, nbytes: int) -> np.ndarray | None:
+        """Raw bytes of a base-step tensor, or None if it cannot serve as a reference."""
+        found = self._base_tensor_index().get(name)
+        if found is None:
+            return None
+        fname, seg = found
+        if seg["dtype"] != dtype or seg["end"] - seg["start"] != nbytes:
+            return None
+        delta_path = self.root / "deltas" / f"global_step_{self.manifest['base_step']}" / f"{fname}.delta"
+        with open(delta_path, "rb") as f:
+            f.seek(seg["frame_offset"])
+            frame = f.read(seg["frame_length"])
+        itemsize = _DTYPE_SIZES.get(dtype, 1)
+        # Base tensors are stored against nothing, so the frame is the tensor itself
+        return unshuffle_bytes(decompress(frame, self.codec, nbytes), itemsize)
+
+    # ---------- add / restore ----------
+
+    def add_step(self, step: int, hf_dir: Path) -> int:
+        """Archive one huggingface/ dir. Returns bytes written."""
+        is_base = self.manifest["base_step"] is None
+        if is_base:
+            self.manifest["base_step"] = step
+
+        step_entry = {"source": str(hf_dir.resolve()), "files": {}}
+        written = 0
+        delta_dir = self.root / "deltas" / f"global_step_{step}"
+
+        for path in sorted(p for p in hf_dir.rglob("*") if p.is_file()):
+            rel = path.relative_to(hf_dir).as_posix()
+
+            if path.suffix != ".safetensors":
+                data = path.read_bytes()
+                digest = hashlib.sha256(data).hexdigest()
+                is_new = not (self.root / "blobs" / digest).exists()
+                self._put_blob(data)
+                if is_new:
+                    written += (self.root / "blobs" / digest).stat().st_size
+                step_entry["files"][rel] = {"blob": digest, "size": len(data)}
+                continue
+
+            header, data_start, segments = read_safetensors_layout(path)
+            data = np.memmap(path, dtype=np.uint8, mode="r")
+            delta_path = delta_dir / f"{rel}.delta"
+            delta_path.parent.mkdir(parents=True, exist_ok=True)
+
+            offset = 0
+            with open(delta_path, "wb") as out:
+                for seg in segments:
+                    buf = np.asarray(data[data_start + seg["start"]:data_start + seg["end"]])
+                    ref = None
+                    if not is_base and seg["name"] is not None:
+                        ref = self._read_base_tensor(seg["name"], seg["dtype"], len(buf))
+                    if ref is not None:
+                        buf = np.bitwise_xor(buf, ref)
+                    frame = compress(shuffle_bytes(buf, _DTYPE_SIZES.get(seg["dtype"], 1)), self.codec)
+                    out.write(frame)
+                    seg["xor_base"] = ref is not None
+                    seg["frame_offset"] = offset
+                    seg["frame_length"] = len(frame)
+                    offset += len(frame)
+            del data
+
+            step_entry["files"][rel] = {
+                "header": self._put_blob(header),
+                "header_size": len(header),
+                "segments": segments,
+                "size": path.stat().st_size,
+                "sha256": sha256_file(path),
+            }
+            written += offset
+
+        self.manifest["steps"][str(step)] = step_entry
+        self.save_manifest()
+        return written
+
+    def restore_step(self, step: int, out_dir: Path) -> None:
+        """Rebuild a normal huggingface/ dir for one archived step."""
+        step_entry = self.manifest["steps"].get(str(step))
+        if step_entry is None:
+            raise KeyError(f"Step {step} not in archive (have: {self.steps()})")
+
+        out_dir.mkdir(parents=True, exist_ok=True)
+        delta_dir = self.root / "deltas" / f"global_step_{step}"
+
+        for rel, entry in step_entry["files"].items():
+            dst = out_dir / rel
+            dst.parent.mkdir(parents=True, exist_ok=True)
+
+            if "blob" in entry:
+                dst.write_bytes(self._get_blob(entry["blob"], entry["size"]))
+                continue
+
+            h = hashlib.sha256()
+            with open(delta_dir / f"{rel}.delta", "rb") as src, open(dst, "wb") as out:
+                header = self._get_blob(entry["header"], entry["header_size"])
+                out.write(header)
+                h.update(header)
+                for seg in entry["segments"]:
+                    nbytes = seg["end"] - seg["start"]
+                    src.seek(seg["frame_offset"])
+                    frame = src.read(seg["frame_length"])
+                    buf = unshuffle_bytes(
+                        decompress(frame, self.codec, nbytes), _DTYPE_SIZES.get(seg["dtype"], 1)
+                    )
+                    if seg["xor_base"]:
+                        ref = self._read_base_tensor(seg["name"], seg["dtype"], nbytes)
+                        if ref is None:
+                            raise ValueError(f"Base tensor missing for {seg['name']}")
+                        buf = np.bitwise_xor(buf, ref)
+                    raw = buf.tobytes()
+                    out.write(raw)
+                    h.update(raw)
+
+            if h.hexdigest() != entry["sha256"]:
+                raise ValueError(f"Checksum mismatch after restoring {rel} for step {step}")
+
+
+# ============================================================
+# Commands
+# ============================================================
+
+def dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def archive_run(run_dir: Path, archive_dir: Path) -> int:
+    archive = CheckpointArchive(archive_dir)
+    done = set(archive.steps())
+
+    # One archive per run: steps from different runs must not share a base or step numbers
+    checkpoints = sorted(
+        [d for d in run_dir.iterdir() if d.is_dir() and d.name.startswith("global_step_")],
+        key=lambda d: int(d.name.split("_")[-1]),
+    )
+    if not checkpoints:
+        print(f"[ERROR] No global_step_* dirs directly under {run_dir} (expected a single run dir)")
+        return 1
+
+    print(f"[INFO] Archive: {archive_dir} (codec={archive.codec})")
+    original_total = 0
+    written_total = 0
+    for ckpt in checkpoints:
+        step = int(ckpt.name.split("_")[-1])
+        _, hf_dir = resolve_checkpoint_dirs(ckpt)
+        if step in done:
+            source = archive.manifest["steps"][str(step)]["source"]
+            if source != str(hf_dir.resolve()):
+                print(f"[ERROR] {ckpt.name} is already archived from a different dir: {source}")
+                return 1
+            print(f"[SKIP] Already archived: {ckpt.name}")
+            continue
+
+        if not hf_dir.exists() or not list(hf_dir.glob("*.safetensors")):
+            print(f"[SKIP] No safetensors in {hf_dir} (run convert_checkpoint.py first)")
+            continue
+
+        original = dir_size(hf_dir)
+        written = archive.add_step(step, hf_dir)
+        original_total += original
+        written_total += written
+        kind = "base" if step == archive.manifest["base_step"] else "delta"
+        print(f"  {ckpt.name}: {original / 1e9:.2f} GB -> {written / 1e9:.3f} GB ({kind})")
+
+    if original_total:
+        print(f"\n[SUMMARY] {original_total / 1e9:.2f} GB -> {written_total / 1e9:.3f} GB "
+              f"({original_total / max(written_total, 1):.1f}x)")
+    print(f"[INFO] Archived steps: {archive.steps()}")
+    return 0
+
+
+def list_archive(archive_dir: Path) -> int:
+    archive = CheckpointArchive(archive_dir)
+    if not archive.steps():
+        print(f"[ERROR] No archive at {archive_dir}")
+        return 1
+    print(f"Archive: {archive_dir} (codec={archive.codec}, base=global_step_{archive.manifest['base_step']})")
+    for step in archive.steps():
+        delta_dir = archive_dir / "deltas" / f"global_step_{step}"
+        size = dir_size(delta_dir) if delta_dir.exists() else 0
+        print(f"  global_step_{step}: {size / 1e9:.3f} GB")
+    print(f"Total on disk: {dir_size(archive_dir) / 1e9:.2f} GB")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delta-compressed archive of veRL HF checkpoints")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_archive = sub.add_parser("archive", help="Add all global_step_* of a run to the archive")
+    p_archive.add_argument("run_dir", type=Path)
+    p_archive.add_argument("--archive", type=Path, default=None, help="Archive dir (default: <run_dir>/archive)")
+
+    p_list = sub.add_parser("list", help="List archived steps")
+    p_list.add_argument("archive", type=Path)
+
+    p_restore = sub.add_parser("restore", help="Rebuild a huggingface/ dir for one step")
+    p_restore.add_argument("archive", type=Path)
+    p_restore.add_argument("--step", type=int, required=True)
+    p_restore.add_argument("--out", type=Path, required=True)
+
+    args = parser.parse_args()
+
+    if args.command == "archive":
+        return archive_run(args.run_dir, args.archive or args.run_dir / "archive")
+    if args.command == "list":
+        return list_archive(args.archive)
+
+    CheckpointArchive(args.archive).restore_step(args.step, args.out)
+    print(f"[DONE] Restored global_step_{args.step} to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
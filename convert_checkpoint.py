@@ -11,19 +11,24 @@ from pathlib import Path
 import torch
 
 
+def resolve_checkpoint_dirs(ckpt_dir: Path) -> tuple[Path, Path]:
+    """Return (weights_dir, hf_dir) for a veRL checkpoint.
+
+    GRPO checkpoints keep everything under actor/, SFT checkpoints keep
+    weights directly in the step dir.
+    """
+    actor_dir = ckpt_dir / "actor"
+    if actor_dir.exists():
+        return actor_dir, actor_dir / "huggingface"
+    return ckpt_dir, ckpt_dir / "huggingface"
+
+
 def convert_single_checkpoint(ckpt_dir: Path, base_model_path: str | None = None):
     """Convert a single veRL checkpoint to HuggingFace format.
 
     Handles both GRPO (has actor/ subdir) and SFT (weights directly in step dir).
     """
-    # Determine layout: GRPO has actor/, SFT does not
-    actor_dir = ckpt_dir / "actor"
-    if actor_dir.exists():
-        weights_dir = actor_dir
-        hf_dir = actor_dir / "huggingface"
-    else:
-        weights_dir = ckpt_dir
-        hf_dir = ckpt_dir / "huggingface"
+    weights_dir, hf_dir = resolve_checkpoint_dirs(ckpt_dir)
 
     if not hf_dir.exists():
         print(f"[SKIP] No huggingface dir: {ckpt_dir}")
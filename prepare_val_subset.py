@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Build a small, fixed, stratified GSM8K validation subset for frequent evals.
+
+Rows of gsm8k_test.parquet are stratified by:
+  - difficulty: number of reasoning steps in the socratic answer
+    (one "sub-question ** answer" line per step)
+  - prompt length: quantile bins over question length
+
+Each stratum gets a share of the subset proportional to its size, so the plain
+subset accuracy is an unbiased estimate of full-set accuracy. The selection is
+deterministic for a given --seed.
+
+Optionally compares subset vs full-set accuracy on logged validation results
+(the per-step JSONL files written by trainer.validation_data_dir=...).
+
+Usage:
+    python prepare_val_subset.py
+    python prepare_val_subset.py --size 300 --length_bins 4
+    python prepare_val_subset.py --results /path/to/outputs/run_name/val_generations
+
+Then point frequent validation at the subset:
+    data.val_files=$SCRIPT_DIR/data/gsm8k_test_fast.parquet trainer.test_freq=25
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import re
+from pathlib import Path
+
+import pandas as pd
+
+VAL_PATH = "/mnt/data8tb/Documents/project/rlvr_winter/verl-my-rlvr/data/gsm8k_test.parquet"
+ANSWERS_PATH = "/mnt/data8tb/Documents/project/my_bench_harness/data/gsm8k/socratic/test.jsonl"
+DST = "/mnt/data8tb/Documents/project/rlvr_winter/verl-my-rlvr/data/gsm8k_test_fast.parquet"
+
+MAX_STEP_BIN = 8  # problems with >= this many steps share one stratum
+
+_QUESTION_RE = re.compile(r"Question:\s*(.*?)\s*\nAnswer:", re.DOTALL)
+
+
+def count_reasoning_steps(answer: str) -> int:
+    """Number of reasoning lines before the '#### <number>' line."""
+    solution = answer.split("####")[0]
+    return sum(1 for line in solution.splitlines() if line.strip())
+
+
+def extract_question(prompt_text: str) -> str:
+    """Pull the question out of a formatted prompt (falls back to the whole text)."""
+    matches = _QUESTION_RE.findall(prompt_text)
+    return matches[-1].strip() if matches else prompt_text.strip()
+
+
+def allocate(sizes: dict, total: int) -> dict:
+    """Proportional allocation with largest remainders; sums to `total`."""
+    n = sum(sizes.values())
+    quotas = {k: total * v / n for k, v in sizes.items()}
+    alloc = {k: min(sizes[k], math.floor(q)) for k, q in quotas.items()}
+    remaining = total - sum(alloc.values())
+    for k in sorted(quotas, key=lambda k: quotas[k] - math.floor(quotas[k]), reverse=True):
+        if remaining <= 0:
+            break
+        if alloc[k] < sizes[k]:
+            alloc[k] += 1
+            remaining -= 1
+    return alloc
+
+
+def build_subset(df: pd.DataFrame, answers: list[dict], size: int, length_bins: int, seed: int) -> pd.DataFrame:
+    """Select a stratified subset of `df`. Adds extra_info with the original index."""
+    if len(answers) != len(df):
+        raise ValueError(f"Answers ({len(answers)}) and validation rows ({len(df)}) are not aligned")
+    for idx, (answer, prompt) in enumerate(zip(answers, df["prompt"])):
+        if answer["question"].strip() != extract_question(prompt[0]["content"]):
+            raise ValueError(f"Answers and validation rows are not aligned: question mismatch at row {idx}")
+
+    steps = [min(count_reasoning_steps(a["answer"]), MAX_STEP_BIN) for a in answers]
+    lengths = pd.Series([len(extract_question(p[0]["content"])) for p in df["prompt"]])
+    length_bin = pd.qcut(lengths.rank(method="first"), q=length_bins, labels=False)
+
+    strata: dict[tuple[int, int], list[int]] = {}
+    for idx, (s, b) in enumerate(zip(steps, length_bin)):
+        strata.setdefault((s, int(b)), []).append(idx)
+
+    alloc = allocate({k: len(v) for k, v in strata.items()}, min(size, len(df)))
+    rng = random.Random(seed)
+    selected = []
+    for key in sorted(strata):
+        selected.extend(rng.sample(strata[key], alloc[key]))
+    selected.sort()
+
+    subset = df.iloc[selected].reset_index(drop=True)
+    subset["extra_info"] = [
+        {"index": idx, "num_steps": steps[idx], "length_bin": int(length_bin[idx])} for idx in selected
+    ]
+
+    print(f"[INFO] Selected {len(subset)}/{len(df)} rows from {len(strata)} strata")
+    print(f"  {'steps':>6s} {'full':>6s} {'subset':>7s}")
+    for s in sorted(set(steps)):
+        full_n = sum(1 for x in steps if x == s)
+        sub_n = sum(1 for i in selected if steps[i] == s)
+        label = f"{s}+" if s == MAX_STEP_BIN else str(s)
+        print(f"  {label:>6s} {full_n:6d} {sub_n:7d}")
+    return subset
+
+
+def load_step_scores(results_dir: Path) -> dict[int, dict[str, float]]:
+    """Load {global_step: {question: mean score}} from validation JSONL dumps."""
+    results = {}
+    for path in sorted(results_dir.glob("*.jsonl")):
+        if not path.stem.isdigit():
+            continue
+        scores: dict[str, list[float]] = {}
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                item = json.loads(line)
+                question = extract_question(item["input"])
+                scores.setdefault(question, []).append(float(item["score"]))
+        results[int(path.stem)] = {q: sum(v) / len(v) for q, v in scores.items()}
+    return results
+
+
+def pearson(xs: list[float], ys: list[float]) -> float:
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    cov = sum((x - mx) * (y - my) for x, y in zip(xs, ys))
+    vx = sum((x - mx) ** 2 for x in xs)
+    vy = sum((y - my) ** 2 for y in ys)
+    return cov / math.sqrt(vx * vy) if vx > 0 and vy > 0 else float("nan")
+
+
+def report_tracking(df: pd.DataFrame, subset: pd.DataFrame, results_dir: Path) -> None:
+    """Compare subset vs full-set accuracy for every logged validation step."""
+    results = load_step_scores(results_dir)
+    if not results:
+        print(f"[WARN] No <global_step>.jsonl files in {results_dir}")
+        return
+
+    all_questions = [extract_question(p[0]["content"]) for p in df["prompt"]]
+    sub_questions = [extract_question(p[0]["content"]) for p in subset["prompt"]]
+
+    print("\n" + "=" * 60)
+    print(f"SUBSET TRACKING ({len(sub_questions)}/{len(all_questions)} rows)")
+    print("=" * 60)
+    print(f"  {'step':>6s} {'full':>7s} {'subset':>7s} {'diff':>7s} {'full_n':>7s} {'missing':>8s}")
+
+    full_accs, sub_accs, sub_ns = [], [], []
+    skipped = []
+    for step, scores in sorted(results.items()):
+        full = [scores[q] for q in all_questions if q in scores]
+        sub = [scores[q] for q in sub_questions if q in scores]
+        missing = len(sub_questions) - len(sub)
+        # Tracking is only measured when the dump covers the whole test set;
+        # a dump of the subset itself (or a partial one) would compare rows to themselves
+        if len(full) < len(all_questions) or not sub:
+            print(f"  {step:6d} {'-':>7s} {'-':>7s} {'-':>7s} {len(full):7d} {missing:8d}"
+                  f"  [SKIP: full-set coverage {len(full)}/{len(all_questions)}]")
+            skipped.append(step)
+            continue
+        full_acc = sum(full) / len(full)
+        sub_acc = sum(sub) / len(sub)
+        full_accs.append(full_acc)
+        sub_accs.append(sub_acc)
+        sub_ns.append(len(sub))
+        print(f"  {step:6d} {full_acc:7.4f} {sub_acc:7.4f} {sub_acc - full_acc:+7.4f} {len(full):7d} {missing:8d}")
+
+    if skipped:
+        print(f"[WARN] {len(skipped)} step(s) without full test-set coverage were not compared: {skipped}")
+    if not full_accs:
+        print("[WARN] No step covers the full test set; tracking cannot be measured")
+        return
+
+    diffs = [s - f for s, f in zip(sub_accs, full_accs)]
+    n, N = min(sub_ns), len(all_questions)
+    p = sum(full_accs) / len(full_accs)
+    # Sampling std error of a proportion with finite population correction
+    std_err = math.sqrt(p * (1 - p) / n * (N - n) / max(N - 1, 1))
+
+    print("-" * 60)
+    print(f"  Mean |diff|: {sum(abs(d) for d in diffs) / len(diffs):.4f}")
+    print(f"  Max  |diff|: {max(abs(d) for d in diffs):.4f}")
+    print(f"  Expected std error at acc={p:.3f}: {std_err:.4f}")
+    if len(full_accs) >= 3:
+        print(f"  Pearson r across steps: {pearson(full_accs, sub_accs):.4f}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a stratified fast-validation subset")
+    parser.add_argument("--val_path", default=VAL_PATH, help="Full validation parquet")
+    parser.add_argument("--answers_path", default=ANSWERS_PATH,
+                        help="Socratic JSONL aligned row-for-row with --val_path")
+    parser.add_argument("--output", default=DST)
+    parser.add_argument("--size", type=int, default=200, help="Number of rows in the subset")
+    parser.add_argument("--length_bins", type=int, default=3, help="Prompt-length quantile bins")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--results", type=str, default="",
+                        help="Dir with <global_step>.jsonl validation dumps to check tracking against")
+    args = parser.parse_args()
+
+    df = pd.read_parquet(args.val_path)
+    with open(args.answers_path) as f:
+        answers = [json.loads(line) for line in f if line.strip()]
+    print(f"Loaded {len(df)} rows from {args.val_path}")
+
+    subset = build_subset(df, answers, args.size, args.length_bins, args.seed)
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    subset.to_parquet(args.output, index=False)
+    print(f"Saved {len(subset)} rows to {args.output}")
+
+    if args.results:
+        report_tracking(df, subset, Path(args.results))
+
+
+if __name__ == "__main__":
+    main()